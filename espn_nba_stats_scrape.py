@@ -1,315 +1,315 @@
 # import packages to allow regex handling of url subdirectories
 
 import re
-import urllib
-import urllib.request
-from time import sleep
 
-# import beautifulsoup library to help parse the tables where player information is stored
-from bs4 import BeautifulSoup, Tag
-
-# create an instance of the beautifulsoup class to parse the page
-f = urllib.request.urlopen('http://www.espn.com/nba/teams')
-teams_soup = BeautifulSoup(f.read(), 'html.parser')
-
-# define an iterable helper class to pull list of links using regexes
-class my_regex_searcher:
-    def __init__(self, regex_string):
-        self.__r = re.compile(regex_string)
-        self.groups = []
-
-    def __call__(self, what):
-        if isinstance(what, Tag):
-            what = what.name
+# import packages for the on-disk page cache
+import os
+import hashlib
 
-        if what:
-            g = self.__r.findall(what)
-            if g:
-                self.groups.append(g)
-                return True
-        return False
+# import asyncio and aiohttp to overlap the ~500 independent page fetches on a
+# single event loop -- coroutines cost far less than one OS thread per fetch,
+# so concurrency can go higher without thread-stack or context-switch pressure
+import asyncio
+import aiohttp
 
-    def __iter__(self):
-        yield from self.groups
+# import a process pool to spread the CPU-bound parsing of the ~450 player
+# pages across cores once their bytes are in hand
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 
-# create instance of regex_searcher for links to roster pages
-roster_searcher = my_regex_searcher(r"/nba/team/roster/_/name/(\w+)/(.+)")
-
-# add all roster page links to a dictionary to unpack the regex searcher object
-scraped_roster_details = dict(zip(teams_soup.find_all(href=roster_searcher), roster_searcher))
+# import beautifulsoup library to help parse the tables where player information is stored
+# (backed by the lxml parser, which builds the tree in C and is much faster than html.parser)
+from bs4 import BeautifulSoup
+
+# precompile the regex patterns used in the scraping hot loops once at module scope,
+# instead of re-looking them up on every call inside the row loops
+_PLAYER_ID_RE = re.compile(r"/id/(\d+)/")
+
+# cache every fetched page on disk keyed by a hash of its url, so reruns during
+# development skip the network entirely; set ESPN_CACHE_DISABLE=1 to always hit
+# the live site (e.g., for a fresh production scrape)
+_CACHE_DIR = '.cache'
+_CACHE_DISABLED = os.environ.get('ESPN_CACHE_DISABLE') == '1'
+
+async def fetch_page(url, session):
+    if not _CACHE_DISABLED:
+        cache_path = os.path.join(_CACHE_DIR, hashlib.md5(url.encode()).hexdigest() + '.html')
+
+        # on a hit, serve the raw html bytes straight from disk
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as cached:
+                return cached.read()
+
+    # fetch the page, retrying transient failures with exponential backoff
+    for attempt in range(3):
+        try:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                content = await response.read()
+            break
+        except aiohttp.ClientError:
+            if attempt == 2:
+                raise
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    # write the page through to the cache for future reruns
+    if not _CACHE_DISABLED:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        with open(cache_path, 'wb') as cached:
+            cached.write(content)
+
+    return content
+
+# helper to fetch one page on a short-lived event loop, for the teams page that
+# everything downstream depends on
+async def fetch_single_page(url):
+    async with aiohttp.ClientSession() as session:
+        return await fetch_page(url, session)
 
-# extract the components of the keys and values in this intermediate dictionary
-# and re-zip them together to create the final cleaned dictionary we'll want to use
-teams = []
-links = []
+# create an instance of the beautifulsoup class to parse the page
+teams_soup = BeautifulSoup(asyncio.run(fetch_single_page('http://www.espn.com/nba/teams')), 'lxml')
 
-for value in scraped_roster_details.values():
-    teams.append(value[0][1])
+# build the roster library in a single selector pass: each roster link's href
+# carries both the team-name slug and the link target, so no stateful search
+# callable or intermediate key/value re-zipping is needed
+_ROSTER_RE = re.compile(r"/nba/team/roster/_/name/(\w+)/(.+)")
 
-for key in scraped_roster_details.keys():
-    links.append('https://www.espn.com' + key.get('href'))    
+rosters_library = dict()
 
-rosters_library = dict(zip(teams,links))
+for link in teams_soup.select('a[href*="/nba/team/roster/_/name/"]'):
+    roster_match = _ROSTER_RE.search(link['href'])
+    if roster_match:
+        rosters_library[roster_match.group(2)] = 'https://www.espn.com' + link['href']
 
 # display the dictionary keys
 rosters_library.keys()
 
-# create function to take a team roster url and collect all player info
+# create function to take a team roster url and collect all player info and ids
+# in a single pass, so each roster page is fetched and parsed exactly once
 
-def get_player_info(team_roster_url):
-    f = urllib.request.urlopen(team_roster_url)
-    team_roster_soup = BeautifulSoup(f.read(), 'html.parser')
+async def scrape_roster(team_roster_url, session):
+    team_roster_soup = BeautifulSoup(await fetch_page(team_roster_url, session), 'lxml')
     
-    # Part 1: Create table headers
-    table_headers = team_roster_soup.find_all('th', {'class':'Table__TH'})
-
-    # convert bs4 result set into string array for regex matching
-    header_values = []
-    for x in table_headers:
-        header_values.append(str(x))
+    # Part 1: Create table headers, reading the text straight from the parsed
+    # tree -- stringifying each cell and regexing the re-serialized html would
+    # redo work the parser has already done
 
-    # extract list of table headers
     column_names = []
-    for x in header_values:
+    for x in team_roster_soup.select('th.Table__TH'):
 
         # Append conditionally to avoid blank spacer block at the top left of the tables
-        if len(re.findall(">([a-zA-Z]+?)<",header_values[header_values.index(x)])) > 0:
-            column_names.append(re.findall(">([a-zA-Z]+?)<",header_values[header_values.index(x)])[0])
+        header_text = x.get_text(strip=True)
+        if header_text:
+            column_names.append(header_text)
     
-    # Part 2: Create player dictionaries
+    # Part 2: Create player and id dictionaries
     roster_dict = dict()
+    ids_dict = dict()
 
-    # Loop through indexes 0-30, which will cover the largest roster size of any NBA team.
-    for i in range(0,30):
+    # grab every player row in a single tree walk, instead of one full-tree
+    # search per data-idx value
+    player_rows = team_roster_soup.find_all('tr', attrs={'data-idx': True})
 
-        # parse corresponding row of table
-        player = team_roster_soup.find_all('tr', {'data-idx': i})
+    for row in player_rows:
 
-        # extract all key values from columns
+        # pull the cell values straight from the parsed tree -- no str() round
+        # trip and no regex over re-serialized html. The name comes from the
+        # anchor so the jersey number in the trailing span is skipped, matching
+        # what the old regex captured.
+        player_stats = []
+        for cell in row.find_all('td'):
+            anchor = cell.find('a')
+            if anchor is not None:
+                cell_text = anchor.get_text(strip=True)
+            else:
+                cell_text = cell.get_text(strip=True)
 
-        # convert bs4 result set into string array for regex matching
-        p_values = []
-        for x in player:
-            p_values.append(str(x))
+            # drop text-free cells (e.g., the headshot block) so the values
+            # stay aligned with the headers, which skip the same spacer column
+            if cell_text:
+                player_stats.append(cell_text)
 
-        # match to contents of tags
-        try:
-            player_stats = re.findall("<.+?\">([a-zA-Z0-9$;,\'\"\s\.\-\&]{1,25}?)</(?!span)", p_values[0])
-            player_dict = dict(zip(column_names, player_stats))
-            roster_dict[player_dict['Name']] = player_dict
-        except IndexError:
-            pass
+        player_dict = dict(zip(column_names, player_stats))
 
-    return roster_dict
+        # skip spacer/blank rows that carry no player name
+        if not player_dict.get('Name'):
+            continue
 
-# create master dictionary of teams and player info
-all_players = dict()
+        roster_dict[player_dict['Name']] = player_dict
 
-for team in rosters_library.keys():
-    all_players[team] = get_player_info(rosters_library[team])
+        # the id and url both come from the player link's href
+        link = row.find('a', href=True)
+        if link is not None:
+            player_url = link['href']
+            player_id = _PLAYER_ID_RE.search(player_url).group(1)
+            ids_dict[player_dict['Name']] = dict(id = player_id, url = player_url)
 
-# import pandas library
-import pandas as pd
+    return roster_dict, ids_dict
 
-# initialize empty pandas dataframe
-all_players_df = pd.DataFrame()
+# create master dictionaries of team player info and player ids, fetching every
+# roster page concurrently since each request is independent and purely I/O-bound;
+# the connector caps how many connections are open at once
+async def scrape_all_rosters(roster_urls):
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=50)) as session:
+        return await asyncio.gather(*(scrape_roster(url, session) for url in roster_urls))
 
-# loop through each team, creating a pandas dataframe as described above
-# and append the records to the all_players_df object
-# adding an extra field 'team' to keep track of data sources
+roster_results = asyncio.run(scrape_all_rosters(rosters_library.values()))
 
-for team in all_players:
-    roster_df = pd.DataFrame.from_dict(all_players[team], orient = 'index')
-    roster_df['Team'] = team
-    all_players_df = pd.concat([all_players_df, roster_df])
+# unpack the (player info, player ids) pairs into the two master dictionaries
+all_players = dict()
+all_player_ids = dict()
 
-# create a function to take a team roster url and collect all of the player ids
+for team, (roster_dict, ids_dict) in zip(rosters_library.keys(), roster_results):
+    all_players[team] = roster_dict
+    all_player_ids[team] = ids_dict
+
+# import pandas library
+import pandas as pd
 
-def get_player_ids(team_roster_url):
-    f = urllib.request.urlopen(team_roster_url)
-    team_roster_soup = BeautifulSoup(f.read(), 'html.parser')
+# flatten the nested team -> player dictionaries into one player-keyed dict,
+# adding an extra field 'Team' to keep track of data sources, and let pandas
+# build the whole frame in a single from_dict call rather than allocating and
+# concatenating a frame per team
 
-    # create player id dictionaries
-    ids_dict = dict()
+player_records = dict()
 
-    # Loop through indexes 0-30, which will cover the largest roster size of any NBA team.
-    for i in range(0,30):
+for team, roster in all_players.items():
+    for player, stats in roster.items():
+        player_records[player] = {**stats, 'Team': team}
 
-        # parse corresponding row of table
-        player_id = team_roster_soup.find_all('tr', {'data-idx': i})
+all_players_df = pd.DataFrame.from_dict(player_records, orient = 'index')
 
-        # extract all ids from anchor links
+# do the same for the id dictionaries
 
-        # convert bs4 result set into string array for regex matching
-        id_values = []
-        for x in player_id:
-            id_values.append(str(x))
+id_records = dict()
 
-        # match to contents of tags
-        try:
-            player_name = re.findall("<.+?\">([a-zA-Z0-9$;,\'\"\s\.\-\&]{1,25}?)</(?!span)", id_values[0])[0]
-            player_id = re.findall("href=\"https://www.espn.com/nba/player/_/id/(\d+?)/[\w\-]+?\"", id_values[0])[0]
-            player_url = re.findall("href=\"(https://www.espn.com/nba/player/_/id/\d+?/[\w\-]+?)\"", id_values[0])[0]
-            ids_dict[player_name] = dict({'id': player_id, 'url': player_url})
-        except IndexError:
-            pass
+for roster_ids in all_player_ids.values():
+    id_records.update(roster_ids)
 
-    return ids_dict
+all_player_ids_df = pd.DataFrame.from_dict(id_records, orient = 'index')
 
-# create a new dictionary to hold all player ids
+# create a function that takes a player page's raw html and extracts the career
+# stats into a dictionary. It does no I/O and lives at module level so it stays
+# picklable and can run inside worker processes.
 
-all_player_ids = dict()
+def parse_player_stats(page_content):
+    # parse individual player's page
+    player_soup = BeautifulSoup(page_content, 'lxml')
 
-# populate this new dictionary with the ids of all players across every NBA team
+    # the stats card is missing entirely for players without recorded stats
+    player_stat_card = player_soup.find('section', {'class':'Card PlayerStats'})
+    if player_stat_card is None:
+        return dict()
 
-for team in rosters_library.keys():
-    all_player_ids[team] = get_player_ids(rosters_library[team])
+    # locate the row labelled 'Career'; its data-idx ties the label table to the
+    # matching row of stat values in the card's companion table
+    career_cell = player_stat_card.find('td', string='Career')
+    if career_cell is None:
+        return dict()
 
-# initialize empty pandas dataframe for ids
-all_player_ids_df = pd.DataFrame()
+    row_number = career_cell.parent.get('data-idx')
+    if row_number is None:
+        return dict()
 
-# loop through each team, creating a pandas dataframe
-# and append the records to the all_player_ids_df object
+    # pull the list of column headers from the card
+    card_headers = [x.get_text(strip=True) for x in player_stat_card.find_all('th')]
 
-for team in all_player_ids:
-    roster_ids_df = pd.DataFrame.from_dict(all_player_ids[team], orient = 'index')
-    all_player_ids_df = pd.concat([all_player_ids_df, roster_ids_df])
+    # pull the career stat values from every row in the card sharing that data-idx
+    card_data = []
+    for row in player_stat_card.find_all('tr', attrs={'data-idx': row_number}):
+        for cell in row.find_all('td'):
+            card_data.append(cell.get_text(strip=True))
 
-# update the all_players_df object with ids
+    return dict(zip(card_headers, card_data))
 
-# note: there are no two players currently in the NBA with the exact same first and last name,
-# and it is unlikely there will be in the future. If this situation did occur, we would need to use
-# the pandas.merge function and specify the name column AND another identifying column (e.g., team)
-# rather than simply joining on the indexes, which in this case are also the names of the players
-all_players_df = all_players_df.join(all_player_ids_df)
+# gather the raw bytes of every player page concurrently under the same
+# connection cap; downloading and parsing are split so each can use the
+# resource it is actually bound by (network vs. cpu)
 
-# create a function that takes a player page url and scrapes a players stats, adding them to a dictionary
+async def fetch_all_player_pages(urls):
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=50)) as session:
+        return await asyncio.gather(*(fetch_page(url, session) for url in urls))
 
-def get_player_stats(player_url):
-    # parse individual player's page
-    f = urllib.request.urlopen(player_url)
-    player_soup = BeautifulSoup(f.read(), 'html.parser')
-
-    # would return blank a blank bs4 ResultSet object if the player stats card did not exist
-    player_stats = player_soup.find_all('section', {'class':'Card PlayerStats'})
-
-    # convert the bs4 resultSet to a string
-    try:
-        player_stat_card = str(player_stats[0])
-    except IndexError:
-        player_stat_card = []
-
-    # search the card for career stats record
-    try:
-        row_number = re.findall("data-idx=\"(\d)\"><td class=\"Table__TD\">Career</td>",player_stat_card)[0]
-    except TypeError:
-        pass
-
-    # pull the list of column headers
-    try:
-        card_headers = re.findall("class=\"Table__TH\".+?>(.+?)</th>", player_stat_card)
-    except TypeError:
-        pass
-
-    # pull the list of career stats
-    try:
-        player_career_stats = re.findall("data-idx=\"{row_number}\">(.+?)</tr>".format(row_number = row_number), player_stat_card)
-    except (TypeError, UnboundLocalError) :
-        pass
-
-    # convert from bs4 resultSet to list
-    try:
-        card_data = []
-        for x in player_career_stats:
-            stats = re.findall("<td class=\"Table__TD\">(.+?)</td>",player_career_stats[player_career_stats.index(x)])
-            for y in stats:
-                card_data.append(str(y))
-    except (IndexError, TypeError, UnboundLocalError):
-        pass
-
-    try:
-        player_dict = dict(zip(card_headers, card_data))
-    except (TypeError, UnboundLocalError):
-        pass
-
-    try:
-        return player_dict
-    except:
-        player_dict = dict()
-        return player_dict
-
-# create a function that takes a dataframe with player names as indexes and uses the above stats-
-# scraping function to return a dictionary of all player career avg. stats for an entire NBA team
+# create a function that takes a dataframe with player names as indexes and uses the above
+# parsing function to return a dictionary of all player career avg. stats for every NBA team
 
 def compile_all_stats(players_dataframe):
 
-    career_stats_dict = dict()
+    # iterate the url column directly rather than via iterrows, which would box
+    # every row into a Series and force a label lookup per player
+    urls = players_dataframe['url']
 
-    for player, info in players_dataframe.iterrows():
-        player_url = players_dataframe.loc[player]["url"]
-        pstats_dict = get_player_stats(player_url)
-        career_stats_dict[player] = pstats_dict
-    
-    return career_stats_dict
+    player_pages = asyncio.run(fetch_all_player_pages(urls))
 
-# compile player career stats dictionary by scraping every NBA player's page
-player_stats_dict = compile_all_stats(all_players_df)
+    # parsing ~450 pages is CPU-bound and every page is independent, so fan the
+    # work out across cores; chunksize batches pages per round trip to keep the
+    # inter-process overhead amortized. The fork context is pinned because
+    # spawn/forkserver workers would re-import -- and therefore re-run -- this
+    # flat script.
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context('fork')) as executor:
+        results = executor.map(parse_player_stats, player_pages, chunksize=16)
 
-# create final dataframe to join with existing player-level data
-all_player_stats_df = pd.DataFrame.from_dict(player_stats_dict, orient = 'index')
+    return dict(zip(urls.index, results))
 
-# join the all_players_df and all_player_stats_df objects
-all_players_df = all_players_df.join(all_player_stats_df)
+# compile player career stats dictionary by scraping every NBA player's page,
+# working from the ids dataframe so the stats exist before any join happens
+player_stats_dict = compile_all_stats(all_player_ids_df)
 
-# convert empty salaries to 0s
-all_players_df['Salary'] = [re.sub(r'--', '$0', x) if isinstance(x, str) else x for x in all_players_df['Salary'].values]
+# create final dataframe to join with existing player-level data
+all_player_stats_df = pd.DataFrame.from_dict(player_stats_dict, orient = 'index')
 
-# convert salaries to numerical values using list comprehension
-all_players_df['Salary'] = [int(re.sub(r'[^\d]+', '', x)) if isinstance(x, str) else x for x in all_players_df['Salary'].values]
+# update the all_players_df object with ids and career stats in a single join,
+# rather than two sequential joins that each copy the growing frame
 
-# convert empty ages to 0s
-all_players_df['Age'] = [re.sub(r'--', '0', x) if isinstance(x, str) else x for x in all_players_df['Age'].values]
+# note: there are no two players currently in the NBA with the exact same first and last name,
+# and it is unlikely there will be in the future. If this situation did occur, we would need to use
+# the pandas.merge function and specify the name column AND another identifying column (e.g., team)
+# rather than simply joining on the indexes, which in this case are also the names of the players
+all_players_df = all_players_df.join([all_player_ids_df, all_player_stats_df])
 
-# convert ages to numerical values using list comprehension
-all_players_df['Age'] = [int(x) if isinstance(x, str) else x for x in all_players_df['Age'].values]
+# the cleanup below uses pandas' vectorized .str accessors, which run in C over
+# the whole column instead of making one Python call per cell
 
-# define a function that takes a string in ft' in" format and converts to total inches as a numerical value
+# convert salaries to numerical values, stripping the '$' and commas and
+# treating empty ('--') salaries as 0
+salaries = all_players_df['Salary'].str.replace(r'[^\d]', '', regex=True)
+all_players_df['Salary'] = pd.to_numeric(salaries, errors='coerce').fillna(0).astype('int64')
 
-def convert_height(height):
-    height_splits = height.split()
-    feet = float(height_splits[0].replace("\'",""))
-    inches = float(height_splits[1].replace("\"",""))
-    return (12*feet + inches)
+# convert ages to numerical values, treating empty ('--') ages as 0
+all_players_df['Age'] = pd.to_numeric(all_players_df['Age'].replace('--', '0'), errors='coerce').fillna(0).astype('int64')
 
-# convert heights to numerical values using list comprehension
+# convert heights from ft' in" format to total inches as a numerical value;
+# one extract plus one float cast hands the whole column to numpy, and the
+# arithmetic then runs as two array ops instead of per-row Python calls
+heights = all_players_df['HT'].str.extract(r"(?P<ft>\d+)'\s*(?P<inch>\d+)\"").astype(float)
+all_players_df['HT'] = heights['ft']*12 + heights['inch']
 
-all_players_df['HT'] = [float(convert_height(x)) if isinstance(x, str) else x for x in all_players_df['HT'].values]
+# next, convert weights to numerical values by extracting the leading digits
 
-# next, convert weights to numerical values with list comprehension
+all_players_df['WT'] = all_players_df['WT'].str.extract(r'(\d+)')[0].astype(float)
 
-all_players_df['WT'] = [float(x.split(" ")[0]) if isinstance(x, str) else x for x in all_players_df['WT'].values]
+# define list of stats columns to convert to floats
+stat_columns = ['GP', 'MIN', 'FG%', '3P%', 'FT%', 'REB', 'AST', 'BLK', 'STL', 'PF', 'TO', 'PTS']
 
-# define dictionary of desired columns and types
-stat_types = {
-    'GP': 'float64',
-    'MIN': 'float64',
-    'FG%': 'float64',
-    '3P%': 'float64',
-    'FT%': 'float64',
-    'REB': 'float64',
-    'AST': 'float64',
-    'BLK': 'float64',
-    'STL': 'float64',
-    'PF': 'float64',
-    'TO': 'float64',
-    'PTS': 'float64'
-}
+# convert each stats column through pd.to_numeric's C fast path, coercing
+# placeholder strings like '--' to 0 rather than letting a strict astype over
+# the mostly-string frame fall back to an exception-driven Python path
+for col in stat_columns:
+    all_players_df[col] = pd.to_numeric(all_players_df[col].replace({'--': 0, '': 0}), errors='coerce').fillna(0.0)
 
-# convert all stats columns to floats using the above dictionary (in-place)
-all_players_df = all_players_df.astype(dtype=stat_types, copy=False, errors='raise')
+# export cleaned dataset as csv through pyarrow, whose Arrow-backed writer
+# serializes in C instead of pandas' Python-level csv formatter
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
-# export cleaned dataset as csv
-all_players_df.to_csv('Aug_2022_NBA_players_full_dataset_cleaned_from_script.csv')
+# the name index duplicates the 'Name' column, so drop it and keep the column
+# as the row key when reading the csv back
+pacsv.write_csv(
+    pa.Table.from_pandas(all_players_df, preserve_index=False),
+    'Aug_2022_NBA_players_full_dataset_cleaned_from_script.csv'
+)
 
 # read in the dataset to dataframe from a csv
-# your_df = pd.read_csv('Aug_2022_NBA_players_full_dataset_cleaned.csv', index_col=0)
\ No newline at end of file
+# your_df = pd.read_csv('Aug_2022_NBA_players_full_dataset_cleaned.csv', index_col=0)
+# for files written by this script, index on the Name column instead:
+# your_df = pd.read_csv('Aug_2022_NBA_players_full_dataset_cleaned_from_script.csv', index_col='Name')
\ No newline at end of file